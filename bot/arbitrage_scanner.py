@@ -4,13 +4,61 @@
 
 import asyncio
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 
+import aiohttp
+import numpy as np
+from eth_abi import decode as abi_decode, encode as abi_encode
 from web3 import Web3
 
+from scanner_kernels import expected_profit_wei
+
 logger = logging.getLogger(__name__)
 
+# عقد Multicall3 المنشور على Polygon (نفس العنوان على معظم الشبكات)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# المحدد الرباعي لدالة getAmountsOut - يحسب مرة واحدة عند تحميل الوحدة
+GET_AMOUNTS_OUT_SELECTOR = Web3.keccak(text="getAmountsOut(uint256,address[])")[:4]
+
+
+@dataclass(slots=True, frozen=True)
+class Opportunity:
+    """فرصة مراجحة مكتشفة
+
+    بنية مدمجة مجمدة بدل القاموس - أقل استهلاكاً للذاكرة وأسرع وصولاً
+    للحقول في حلقة المقارنة الساخنة. الحقول الأخيرة تملؤها حماية MEV
+    عبر dataclasses.replace.
+    """
+    base_asset: str
+    quote_asset: str
+    direction: str
+    buy_router: str
+    sell_router: str
+    buy_path: List[str]
+    sell_path: List[str]
+    buy_price: int
+    sell_price: int
+    price_diff_percent: float
+    expected_profit: int
+    trade_size: int
+    discovery_time: float
+    strategy: int = 0
+    min_out_buy: int = 0
+    min_out_sell: int = 0
+    nonce: int = 0
+    timestamp: int = 0
+    deadline: int = 0
+    max_gas_price: int = 0
+    signature: str = ''
+    tx_hash: str = ''
+
 class ArbitrageScanner:
     """
     فحص واكتشاف فرص المراجحة بين DEXs مختلفة
@@ -23,9 +71,18 @@ class ArbitrageScanner:
         # أزواج التداول الممكنة
         self.trading_pairs = bot.config['trading']['pairs']
         
-        # تاريخ الاكتشاف
-        self.discovery_history = []
+        # تاريخ الاكتشاف (حلقة دائرية - الإضافة والإزاحة O(1))
+        self.discovery_history = deque(maxlen=1000)
         self.last_prices = {}
+
+        # ذاكرة تخزين مؤقت للأسعار مفتاحها (البلوك، الرواتر، الزوج)
+        # طالما لم يتقدم رأس السلسلة فالأسعار المخزنة صالحة ولا داعي لإعادة الجلب
+        self._price_cache: Dict[tuple, int] = {}
+        self._calldata_cache: Dict[tuple, bytes] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._current_block = 0
+        self._price_map_block = 0
+        self._last_price_map: Optional[Dict] = None
         
         # الإحصائيات
         self.stats = {
@@ -34,41 +91,114 @@ class ArbitrageScanner:
             'best_opportunity': 0,
             'scan_speed_avg': 0
         }
+
+        # درجة ربحية لكل زوج (متوسط أسي) - الأزواج الأكثر ربحاً مؤخراً
+        # تفحص أولاً حتى يُلتقط الأفضل قبل انتهاء مهلة الدورة
+        self._pair_scores: Dict[Tuple[str, str], float] = {}
+        self._score_alpha = 0.3
+
+        # حد التزامن لطلبات RPC حتى لا يرفضها المزود العام تحت الضغط
+        self._rpc_sem = asyncio.Semaphore(
+            bot.config['rpc'].get('max_concurrent', 64)
+        )
+
+        # عقد Multicall3 لتجميع جميع استعلامات الأسعار في طلب RPC واحد
+        self.multicall = self.w3.eth.contract(
+            address=MULTICALL3_ADDRESS,
+            abi=self._get_multicall3_abi()
+        )
+
+        # كائنات عقود الرواتر تُبنى مرة واحدة - بناؤها لكل استدعاء يعيد
+        # تحليل الـ ABI وإنشاء كائنات الدوال في كل مرة
+        self._router_abi = self._get_router_abi()
+        self._router_contracts = {
+            address: self.w3.eth.contract(address=address, abi=self._router_abi)
+            for address in bot.trading_cfg.enabled_routers
+        }
     
-    async def scan_opportunities(self) -> List[Dict]:
+    async def scan_opportunities(self) -> List['Opportunity']:
         """فحص جميع فرص المراجحة الممكنة"""
         opportunities = []
         
         try:
-            # فحص كل زوج تداول
+            # تحديث رقم البلوك الحالي مرة واحدة لكل دورة مسح
+            try:
+                self._current_block = await self.w3.eth.block_number
+            except Exception as e:
+                logger.debug("Failed to refresh block number: %s", e)
+
+            # إزالة الأسعار المخزنة لبلوكات قديمة
+            min_block = self._current_block - 2
+            self._price_cache = {
+                k: v for k, v in self._price_cache.items() if k[0] >= min_block
+            }
+
+            # مهلة الدورة: يجب تسليم أفضل ما وُجد قبل انقضاء نافذة البلوك
+            deadline = time.monotonic() + self.bot.trading_cfg.check_interval * 0.8
+
+            # جلب جميع الأسعار (كل الأزواج × كل الرواتر) في طلب Multicall واحد
+            price_map = await self._fetch_all_prices()
+
+            # ترتيب الأزواج بالربحية الحديثة - الأفضل تاريخياً يفحص أولاً
+            ordered_pairs = sorted(
+                self.trading_pairs,
+                key=lambda p: self._pair_scores.get((p['base'], p['quote']), 0.0),
+                reverse=True
+            )
+
+            if price_map is not None:
+                # المقارنات محلية (بلا RPC) - تفحص بالترتيب مع احترام المهلة
+                for pair in ordered_pairs:
+                    if time.monotonic() > deadline:
+                        logger.debug("Scan deadline reached, returning best found so far")
+                        break
+                    try:
+                        opportunities.extend(await self._scan_pair(pair, price_map))
+                    except Exception as e:
+                        logger.debug("Error scanning pair %s/%s: %s", pair['base'], pair['quote'], e)
+            else:
+                # المسار الاحتياطي مقيد بالشبكة - يبقى متوازياً بالكامل
+                pair_results = await asyncio.gather(
+                    *(self._scan_pair(pair, None) for pair in ordered_pairs),
+                    return_exceptions=True
+                )
+
+                for pair, result in zip(ordered_pairs, pair_results):
+                    if isinstance(result, Exception):
+                        logger.debug("Error scanning pair %s/%s: %s", pair['base'], pair['quote'], result)
+                    else:
+                        opportunities.extend(result)
+
+            # تحديث درجات الأزواج (متوسط أسي على أفضل ربح في الدورة)
+            best_by_pair: Dict[Tuple[str, str], float] = {}
+            for opp in opportunities:
+                key = (opp.base_asset, opp.quote_asset)
+                if opp.expected_profit > best_by_pair.get(key, 0):
+                    best_by_pair[key] = opp.expected_profit
+
+            a = self._score_alpha
             for pair in self.trading_pairs:
-                try:
-                    pair_opportunities = await self._scan_pair(pair)
-                    opportunities.extend(pair_opportunities)
-                except Exception as e:
-                    logger.debug(f"Error scanning pair {pair['base']}/{pair['quote']}: {e}")
+                key = (pair['base'], pair['quote'])
+                old_score = self._pair_scores.get(key, 0.0)
+                self._pair_scores[key] = a * best_by_pair.get(key, 0.0) + (1 - a) * old_score
             
             # تحديث الإحصائيات
             self.stats['total_scans'] += 1
             self.stats['profitable_opportunities'] += len(opportunities)
             
             if opportunities:
-                best_profit = max(opp['expected_profit'] for opp in opportunities)
+                best_profit = max(opp.expected_profit for opp in opportunities)
                 if best_profit > self.stats['best_opportunity']:
                     self.stats['best_opportunity'] = best_profit
-            
-            # تسجيل الفرص المكتشفة
+
+            # تسجيل الفرص المكتشفة (طوابع زمنية رقمية - التحويل إلى نص يؤجل للقراءة)
             for opp in opportunities:
-                self.discovery_history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'pair': f"{opp['base_asset']}/{opp['quote_asset']}",
-                    'profit': opp['expected_profit'],
-                    'direction': opp['direction']
-                })
-            
-            # الاحتفاظ بآخر 1000 اكتشاف فقط
-            if len(self.discovery_history) > 1000:
-                self.discovery_history = self.discovery_history[-1000:]
+                self.discovery_history.append((
+                    opp.discovery_time,
+                    f"{opp.base_asset}/{opp.quote_asset}",
+                    opp.expected_profit,
+                    opp.direction
+                ))
             
             return opportunities
             
@@ -76,72 +206,79 @@ class ArbitrageScanner:
             logger.error(f"Error in scan_opportunities: {e}")
             return []
     
-    async def _scan_pair(self, pair: Dict) -> List[Dict]:
+    async def _scan_pair(self, pair: Dict, price_map: Optional[Dict] = None) -> List['Opportunity']:
         """فحص فرص المراجحة لزوج معين"""
         opportunities = []
-        
-        # الحصول على الأسعار من جميع الرواتر
-        prices = await self._get_prices_for_pair(pair)
+
+        # الحصول على الأسعار من جميع الرواتر (من الـ Multicall إن توفر)
+        if price_map is not None:
+            prices = price_map.get((pair['base'], pair['quote']), [])
+        else:
+            prices = await self._get_prices_for_pair(pair)
         
         if len(prices) < 2:
             return opportunities
         
-        # البحث عن فروق الأسعار
-        for i, (router1, price1) in enumerate(prices):
-            for j, (router2, price2) in enumerate(prices[i+1:], i+1):
-                if router1 == router2:
-                    continue
-                
-                # حساب فرق السعر
-                price_diff = abs(price1 - price2)
-                price_diff_percent = price_diff / min(price1, price2)
-                
-                # التحقق من فرق السعر الأدنى
-                min_price_diff = self.bot.config['trading']['min_price_diff']
-                if price_diff_percent < min_price_diff:
-                    continue
-                
-                # تحديد اتجاه المراجحة
-                if price1 < price2:
-                    # الشراء من router1 والبيع على router2
-                    direction = 'buy_low_sell_high'
-                    buy_router = router1
-                    sell_router = router2
-                    buy_price = price1
-                    sell_price = price2
-                else:
-                    # الشراء من router2 والبيع على router1
-                    direction = 'buy_low_sell_high'
-                    buy_router = router2
-                    sell_router = router1
-                    buy_price = price2
-                    sell_price = price1
-                
-                # حساب الربح المتوقع
-                trade_size = self.bot.config['trading']['default_trade_size']
-                expected_profit = await self._calculate_expected_profit(
-                    pair, direction, trade_size, buy_price, sell_price
-                )
-                
-                # التحقق من الربحية بعد احتساب التكاليف
-                if expected_profit > 0:
-                    opportunity = {
-                        'base_asset': pair['base'],
-                        'quote_asset': pair['quote'],
-                        'direction': direction,
-                        'buy_router': buy_router,
-                        'sell_router': sell_router,
-                        'buy_path': [pair['base'], pair['quote']],
-                        'sell_path': [pair['quote'], pair['base']],
-                        'buy_price': buy_price,
-                        'sell_price': sell_price,
-                        'price_diff_percent': price_diff_percent,
-                        'expected_profit': expected_profit,
-                        'trade_size': trade_size,
-                        'discovery_time': datetime.now().isoformat()
-                    }
-                    
-                    opportunities.append(opportunity)
+        # حساب جميع فروق الأسعار الزوجية دفعة واحدة بدل حلقة O(N²) في بايثون
+        # (float64 كافٍ لفرز الفروق؛ حساب الربح نفسه يبقى بأعداد wei صحيحة)
+        routers = [router for router, _ in prices]
+        prices_arr = np.array([price for _, price in prices], dtype=np.float64)
+
+        diff = np.abs(prices_arr[:, None] - prices_arr[None, :])
+        mn = np.minimum(prices_arr[:, None], prices_arr[None, :])
+        pct = diff / mn
+
+        # ربط قيم الإعدادات مرة واحدة قبل الحلقة - وصول slot مباشر
+        trading_cfg = self.bot.trading_cfg
+        min_price_diff = trading_cfg.min_price_diff
+        trade_size = trading_cfg.default_trade_size
+
+        # الأزواج (i, j) في المثلث العلوي التي تتجاوز الحد الأدنى فقط
+        i_idx, j_idx = np.nonzero(np.triu(pct >= min_price_diff, k=1))
+
+        for i, j in zip(i_idx.tolist(), j_idx.tolist()):
+            router1, price1 = routers[i], prices[i][1]
+            router2, price2 = routers[j], prices[j][1]
+            price_diff_percent = float(pct[i, j])
+
+            # تحديد اتجاه المراجحة
+            if price1 < price2:
+                # الشراء من router1 والبيع على router2
+                direction = 'buy_low_sell_high'
+                buy_router = router1
+                sell_router = router2
+                buy_price = price1
+                sell_price = price2
+            else:
+                # الشراء من router2 والبيع على router1
+                direction = 'buy_low_sell_high'
+                buy_router = router2
+                sell_router = router1
+                buy_price = price2
+                sell_price = price1
+
+            # حساب الربح المتوقع
+            expected_profit = await self._calculate_expected_profit(
+                pair, direction, trade_size, buy_price, sell_price
+            )
+
+            # التحقق من الربحية بعد احتساب التكاليف
+            if expected_profit > 0:
+                opportunities.append(Opportunity(
+                    base_asset=pair['base'],
+                    quote_asset=pair['quote'],
+                    direction=direction,
+                    buy_router=buy_router,
+                    sell_router=sell_router,
+                    buy_path=[pair['base'], pair['quote']],
+                    sell_path=[pair['quote'], pair['base']],
+                    buy_price=buy_price,
+                    sell_price=sell_price,
+                    price_diff_percent=price_diff_percent,
+                    expected_profit=expected_profit,
+                    trade_size=trade_size,
+                    discovery_time=time.time()
+                ))
         
         return opportunities
     
@@ -149,83 +286,251 @@ class ArbitrageScanner:
         """الحصول على الأسعار من جميع الرواتر لزوج معين"""
         prices = []
         
-        # الحصول على الأسعار من كل رواتر مفعل
-        enabled_routers = self.bot.config['trading']['enabled_routers']
-        
-        for router_address in enabled_routers:
-            try:
-                price = await self._get_price_from_router(pair, router_address)
-                if price > 0:
-                    prices.append((router_address, price))
-                    
-                    # تحديث آخر سعر معروف
-                    key = f"{pair['base']}_{pair['quote']}_{router_address}"
-                    self.last_prices[key] = {
-                        'price': price,
-                        'timestamp': datetime.now().isoformat()
-                    }
-            except Exception as e:
-                logger.debug(f"Error getting price from {router_address}: {e}")
-        
+        # الحصول على الأسعار من جميع الرواتر المفعلة بشكل متزامن
+        enabled_routers = self.bot.trading_cfg.enabled_routers
+
+        tasks = [
+            asyncio.create_task(self._get_price_from_router(pair, router_address))
+            for router_address in enabled_routers
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for router_address, price in zip(enabled_routers, results):
+            if isinstance(price, Exception):
+                logger.debug("Error getting price from %s: %s", router_address, price)
+                continue
+
+            if price > 0:
+                prices.append((router_address, price))
+
+                # تحديث آخر سعر معروف
+                key = f"{pair['base']}_{pair['quote']}_{router_address}"
+                self.last_prices[key] = {
+                    'price': price,
+                    'ts': time.monotonic()
+                }
+
         return prices
     
-    async def _get_price_from_router(self, pair: Dict, router_address: str) -> float:
-        """الحصول على سعر من رواتر معين"""
+    async def _call_with_retry(self, contract_fn, attempts: int = 5):
+        """تنفيذ استدعاء عقد مع حد تزامن وإعادة محاولة بتراجع أسي
+
+        الأخطاء الشبكية العابرة (انقطاع الاتصال، المهلة، حدود المعدل)
+        تعاد محاولتها؛ أي خطأ آخر يُرفع مباشرة.
+        """
+        async with self._rpc_sem:
+            last_error = None
+            for attempt in range(attempts):
+                try:
+                    return await contract_fn.call()
+                except (aiohttp.ClientError, asyncio.TimeoutError, TimeoutError) as e:
+                    last_error = e
+                    await asyncio.sleep(0.1 * 2**attempt)
+            raise last_error
+
+    async def _fetch_all_prices(self) -> Optional[Dict[Tuple[str, str], List[tuple]]]:
+        """جلب أسعار جميع الأزواج من جميع الرواتر في استدعاء aggregate3 واحد
+
+        يجمع كل استعلامات getAmountsOut في طلب RPC واحد بدلاً من
+        (عدد الأزواج × عدد الرواتر) طلبات منفصلة. يعيد None عند الفشل
+        ليتم الرجوع إلى المسار الفردي لكل رواتر.
+        """
+        enabled_routers = self.bot.trading_cfg.enabled_routers
+
+        # المسار الأسرع: أسعار محسوبة من احتياطيات مخزنة محلياً (صفر RPC)
+        watcher = getattr(self.bot, 'reserve_watcher', None)
+        if watcher is not None:
+            watched_map = watcher.build_price_map(
+                self.trading_pairs, enabled_routers, 1 * 10**18,
+                self.bot.trading_cfg.dex_fee_bps
+            )
+            if watched_map is not None:
+                return watched_map
+
+        # إذا لم يتقدم رأس السلسلة منذ آخر جلب فالخريطة المخزنة ما زالت صالحة
+        if (self._last_price_map is not None
+                and self._current_block
+                and self._current_block == self._price_map_block):
+            return self._last_price_map
+
+        # بناء قائمة الاستدعاءات مع الاحتفاظ بترتيب (زوج، رواتر) لفك النتائج
+        # البيانات لا تعتمد على الرواتر، فتُرمز مرة لكل زوج وتُخزن عبر الدورات
+        calls = []
+        call_index = []
+        amount_in = 1 * 10**18  # 1 token (افتراضي 18 decimal)
+
+        for pair in self.trading_pairs:
+            calldata = self._encode_get_amounts_out(
+                amount_in, pair['base'], pair['quote']
+            )
+            for router_address in enabled_routers:
+                calls.append((router_address, True, calldata))  # allowFailure=True
+                call_index.append((pair, router_address))
+
         try:
-            # استخدام دالة getAmountsOut في العقد
-            router_contract = self.w3.eth.contract(
-                address=router_address,
-                abi=self._get_router_abi()
+            results = await self._call_with_retry(self.multicall.functions.aggregate3(calls))
+        except Exception as e:
+            logger.debug("Multicall price fetch failed, falling back: %s", e)
+            return None
+
+        # فك النتائج وإعادتها إلى خرائط (زوج -> [(رواتر، سعر)])
+        price_map = {key: [] for key in
+                     ((p['base'], p['quote']) for p in self.trading_pairs)}
+
+        for (pair, router_address), (success, return_data) in zip(call_index, results):
+            if not success or len(return_data) == 0:
+                continue
+
+            try:
+                amounts = abi_decode(['uint256[]'], return_data)[0]
+            except Exception as e:
+                logger.debug("Failed to decode multicall result from %s: %s", router_address, e)
+                continue
+
+            if len(amounts) >= 2 and amounts[1] > 0:
+                price = amounts[1]  # سعر خام بوحدة wei - لا تحويل إلى float
+                price_map[(pair['base'], pair['quote'])].append((router_address, price))
+
+                # تحديث آخر سعر معروف
+                key = f"{pair['base']}_{pair['quote']}_{router_address}"
+                self.last_prices[key] = {
+                    'price': price,
+                    'ts': time.monotonic()
+                }
+
+        self._last_price_map = price_map
+        self._price_map_block = self._current_block
+
+        return price_map
+
+    def _encode_get_amounts_out(self, amount_in: int, base: str, quote: str) -> bytes:
+        """ترميز بيانات استدعاء getAmountsOut مع التخزين المؤقت
+
+        لا تعتمد البيانات إلا على (الكمية، المسار) فتُرمز مرة واحدة
+        وتُعاد من الذاكرة في كل الدورات التالية.
+        """
+        key = (amount_in, base, quote)
+        calldata = self._calldata_cache.get(key)
+        if calldata is None:
+            calldata = GET_AMOUNTS_OUT_SELECTOR + abi_encode(
+                ['uint256', 'address[]'], [amount_in, [base, quote]]
             )
-            
+            self._calldata_cache[key] = calldata
+        return calldata
+
+    def _get_multicall3_abi(self) -> List:
+        """الحصول على ABI لعقد Multicall3"""
+        # ABI مبسط يقتصر على aggregate3
+        return [
+            {
+                "inputs": [
+                    {
+                        "components": [
+                            {"internalType": "address", "name": "target", "type": "address"},
+                            {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                            {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                        ],
+                        "internalType": "struct Multicall3.Call3[]",
+                        "name": "calls",
+                        "type": "tuple[]"
+                    }
+                ],
+                "name": "aggregate3",
+                "outputs": [
+                    {
+                        "components": [
+                            {"internalType": "bool", "name": "success", "type": "bool"},
+                            {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                        ],
+                        "internalType": "struct Multicall3.Result[]",
+                        "name": "returnData",
+                        "type": "tuple[]"
+                    }
+                ],
+                "stateMutability": "payable",
+                "type": "function"
+            }
+        ]
+
+    async def _get_price_from_router(self, pair: Dict, router_address: str) -> int:
+        """الحصول على سعر من رواتر معين"""
+        # التحقق من الذاكرة المؤقتة أولاً - السعر ثابت داخل البلوك الواحد
+        cache_key = (self._current_block, router_address, pair['base'], pair['quote'])
+        cached = self._price_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # دمج الاستدعاءات المتطابقة المتزامنة في طلب واحد (منع التدافع)
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(
+            self._fetch_price_from_router(pair, router_address, cache_key)
+        )
+        self._inflight[cache_key] = task
+        try:
+            return await task
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    async def _fetch_price_from_router(
+        self, pair: Dict, router_address: str, cache_key: tuple
+    ) -> int:
+        """الجلب الفعلي لسعر رواتر واحد (بعد تجاوز الذاكرة والدمج)"""
+        try:
+            # استخدام دالة getAmountsOut في العقد (كائن مخزن منذ الإنشاء)
+            router_contract = self._router_contracts.get(router_address)
+            if router_contract is None:
+                router_contract = self.w3.eth.contract(
+                    address=router_address,
+                    abi=self._router_abi
+                )
+                self._router_contracts[router_address] = router_contract
+
             amount_in = 1 * 10**18  # 1 token (افتراضي 18 decimal)
             path = [pair['base'], pair['quote']]
             
-            amounts = router_contract.functions.getAmountsOut(amount_in, path).call()
+            amounts = await self._call_with_retry(
+                router_contract.functions.getAmountsOut(amount_in, path)
+            )
             
             if len(amounts) >= 2:
-                return amounts[1] / 10**18  # تحويل إلى عدد صحيح
+                price = amounts[1]  # سعر خام بوحدة wei
+                self._price_cache[cache_key] = price
+                return price
             else:
                 return 0
                 
         except Exception as e:
-            logger.debug(f"Price fetch failed for {router_address}: {e}")
+            logger.debug("Price fetch failed for %s: %s", router_address, e)
             
             # محاولة بديلة: استخدام API خارجي
             return await self._get_price_from_api(pair, router_address)
     
-    async def _get_price_from_api(self, pair: Dict, router_address: str) -> float:
+    async def _get_price_from_api(self, pair: Dict, router_address: str) -> int:
         """الحصول على سعر من API خارجي (بديل)"""
         # يمكن تنفيذ هذا باستخدام GeckoTerminal أو API مشابه
         # للتبسيط، نعود إلى سعر ثابت
-        return 1.0  # قيمة افتراضية
+        return 1 * 10**18  # قيمة افتراضية (1:1 بوحدة wei)
     
     async def _calculate_expected_profit(
         self, 
         pair: Dict, 
         direction: str, 
         trade_size: int, 
-        buy_price: float, 
-        sell_price: float
+        buy_price: int, 
+        sell_price: int
     ) -> int:
-        """حساب الربح المتوقع"""
+        """حساب الربح المتوقع بحساب صحيح كامل بوحدة wei
+
+        الحساب بالأعداد الصحيحة يحاكي حساب العقد على السلسلة ويتجنب
+        فقدان دقة float الذي يقلب إشارة الفرص الهامشية.
+        """
         try:
-            # حساب الكمية التي سيتم شراؤها
-            buy_amount = trade_size
-            
-            # حساب الكمية التي سيتم بيعها (بعد احتساب slippage)
-            sell_amount = buy_amount * sell_price / buy_price
-            
-            # خصم رسوم التداول
-            fee_percent = self.bot.config['trading']['dex_fee_percent']
-            sell_amount = sell_amount * (1 - fee_percent)
-            
-            # الربح المتوقع
-            expected_profit = sell_amount - buy_amount
-            
-            # تحويل إلى wei
-            return int(expected_profit * 10**18)
-            
+            fee_bps = self.bot.trading_cfg.dex_fee_bps
+            return expected_profit_wei(trade_size, buy_price, sell_price, fee_bps)
+
         except Exception as e:
             logger.error(f"Error calculating expected profit: {e}")
             return 0
@@ -252,6 +557,10 @@ class ArbitrageScanner:
         """الحصول على إحصائيات الماسح"""
         return self.stats
     
-    def get_recent_discoveries(self, limit: int = 10) -> List[Dict]:
-        """الحصول على آخر الاكتشافات"""
-        return self.discovery_history[-limit:] if self.discovery_history else []
+    def get_recent_discoveries(self, limit: int = 10) -> List[tuple]:
+        """الحصول على آخر الاكتشافات (التحويل إلى ISO يتم هنا فقط)"""
+        start = max(0, len(self.discovery_history) - limit)
+        return [
+            (datetime.fromtimestamp(ts).isoformat(), pair_str, profit, direction)
+            for ts, pair_str, profit, direction in islice(self.discovery_history, start, None)
+        ]
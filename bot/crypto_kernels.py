@@ -0,0 +1,31 @@
+"""
+نوى التجزئة الساخنة لحماية MEV
+
+تستدعى مرة لكل فرصة محمية، والعبء فيها هو صياغة البايتات حول نداءات
+xxh3 لا التجزئة نفسها. بتوقيعات ثابتة الأنواع يمكن ترجمتها إلى امتداد C
+عبر mypyc (python -m mypyc bot/crypto_kernels.py) أو cythonize دون أي
+تعديل؛ عند غياب النسخة المترجمة تعمل كبايثون عادي.
+"""
+
+import xxhash
+
+
+def unique_nonce(base_asset: bytes, quote_asset: bytes, ts_ns: int) -> int:
+    """nonce فريد من عنواني الزوج وطابع النانوثانية"""
+    h = xxhash.xxh3_64()
+    h.update(base_asset)
+    h.update(quote_asset)
+    h.update(ts_ns.to_bytes(8, 'big'))
+    return h.intdigest()
+
+
+def tx_id(base_asset: bytes, trade_size: int, nonce: int,
+          timestamp: int, executor_addr: bytes) -> str:
+    """معرف داخلي للمعاملة - التوقيع EIP-712 هو الضمانة التشفيرية"""
+    h = xxhash.xxh3_128()
+    h.update(base_asset)
+    h.update(trade_size.to_bytes(32, 'big'))
+    h.update(nonce.to_bytes(32, 'big'))
+    h.update(timestamp.to_bytes(8, 'big'))
+    h.update(executor_addr)
+    return h.hexdigest()
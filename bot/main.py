@@ -8,15 +8,23 @@ import json
 import logging
 import signal
 import sys
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from typing import Dict, List, Optional
 
+import aiohttp
+import orjson
 import yaml
-from web3 import Web3
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+from web3.middleware import async_geth_poa_middleware, geth_poa_middleware
 from eth_account import Account
 
 from arbitrage_scanner import ArbitrageScanner
 from mev_protector import MEVProtector
+from reserve_watcher import ReserveWatcher
 from transaction_executor import TransactionExecutor
 from monitoring.metrics import MetricsCollector
 from monitoring.alerts import AlertSystem
@@ -33,6 +41,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True, slots=True)
+class TradingConfig:
+    """قيم التداول المستخدمة في المسارات الساخنة
+
+    تُحل من القاموس مرة واحدة عند البدء؛ الوصول إلى slot أرخص من
+    سلسلتي بحث في القواميس في كل تكرار.
+    """
+    min_profit: int
+    min_price_diff: float
+    default_trade_size: int
+    dex_fee_percent: float
+    dex_fee_bps: int
+    check_interval: float
+    enabled_routers: tuple
+
+
 class FlashLoanArbitrageBot:
     """
     البوت الرئيسي لتنفيذ استراتيجيات المراجحة باستخدام Flash Loans
@@ -45,12 +70,17 @@ class FlashLoanArbitrageBot:
         
         self._validate_config()
         
-        # إعداد Web3
-        self.w3_main = Web3(Web3.HTTPProvider(self.config['rpc']['mainnet']))
+        # إعداد Web3 - مزود غير متزامن للقراءات حتى لا تحجب حلقة الأحداث
+        # العقدة المحلية (إن وجدت) أولاً: استعلاماتها أسرع بمرتبة كاملة
+        self._primary_rpc = self.config['rpc'].get('local') or self.config['rpc']['mainnet']
+        self.w3_main = AsyncWeb3(AsyncHTTPProvider(
+            self._primary_rpc,
+            request_kwargs={'timeout': 5}
+        ))
         self.w3_private = Web3(Web3.HTTPProvider(self.config['rpc']['private']))
-        
+
         # إعداد Polygon
-        self.w3_main.middleware_onion.inject(geth_poa_middleware, layer=0)
+        self.w3_main.middleware_onion.inject(async_geth_poa_middleware, layer=0)
         self.w3_private.middleware_onion.inject(geth_poa_middleware, layer=0)
         
         # الحسابات
@@ -68,17 +98,29 @@ class FlashLoanArbitrageBot:
         
         # المكونات
         self.scanner = ArbitrageScanner(self)
+        self.reserve_watcher = ReserveWatcher(self)
         self.mev_protector = MEVProtector(self)
         self.executor_module = TransactionExecutor(self)
         self.metrics = MetricsCollector(self)
         self.alerts = AlertSystem(self)
         self.dashboard = DashboardServer(self)
         
+        # جلسة HTTP دائمة تنشأ عند البدء وتشاركها جميع طلبات RPC
+        self._http: Optional[aiohttp.ClientSession] = None
+
+        # كاش سعر الغاز - يتغير مع البلوك (~2 ثانية) فطلب واحد يكفي الجميع
+        self._gas_price: int = 0
+        self._gas_price_ts: float = 0.0
+
         # الحالة
         self.is_running = False
         self.last_scan_time = 0
         self.active_trades = {}
-        self.trade_history = []
+
+        # طابور أولوية للصفقات - المنفذ يستيقظ فقط عند وجود عمل،
+        # والأعلى ربحاً يخرج أولاً دون مسح O(N) كل 100ms
+        self._trade_queue = asyncio.PriorityQueue()
+        self.trade_history = deque(maxlen=10000)
         
         # الإحصائيات
         self.stats = {
@@ -117,7 +159,27 @@ class FlashLoanArbitrageBot:
                 if key not in value:
                     raise ValueError(f"Missing config field: {field}")
                 value = value[key]
-    
+
+        # تجميد قيم التداول الساخنة في بنية ثابتة الحقول
+        trading = self.config['trading']
+        self.trading_cfg = TradingConfig(
+            min_profit=trading['min_profit'],
+            min_price_diff=trading['min_price_diff'],
+            default_trade_size=trading['default_trade_size'],
+            dex_fee_percent=trading['dex_fee_percent'],
+            dex_fee_bps=int(trading['dex_fee_percent'] * 10000),
+            check_interval=trading['check_interval'],
+            enabled_routers=tuple(trading['enabled_routers'])
+        )
+
+    async def cached_gas_price(self) -> int:
+        """سعر الغاز الحالي مع كاش لثانية واحدة - طلب RPC واحد يخدم كل المستهلكين"""
+        now = time.monotonic()
+        if now - self._gas_price_ts > 1.0:
+            self._gas_price = await self.w3_main.eth.gas_price
+            self._gas_price_ts = now
+        return self._gas_price
+
     async def start(self):
         """بدء تشغيل البوت"""
         self.is_running = True
@@ -127,10 +189,36 @@ class FlashLoanArbitrageBot:
         signal.signal(signal.SIGTERM, self._handle_shutdown)
         
         logger.info("🚀 Starting Flash Loan Arbitrage Bot...")
-        
+
+        # جلسة HTTP واحدة باتصالات حية - توفر مصافحة TCP/TLS لكل طلب RPC
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=256,
+                limit_per_host=64,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+        )
+        await self.w3_main.provider.cache_async_session(self._http)
+
+        # التراجع إلى المزود العام إذا كانت العقدة المحلية غير متاحة
+        if self._primary_rpc != self.config['rpc']['mainnet']:
+            if not await self.w3_main.is_connected():
+                logger.warning(
+                    f"⚠️ Local node {self._primary_rpc} unreachable, "
+                    f"falling back to public RPC"
+                )
+                self.w3_main.provider = AsyncHTTPProvider(
+                    self.config['rpc']['mainnet'],
+                    request_kwargs={'timeout': 5}
+                )
+                await self.w3_main.provider.cache_async_session(self._http)
+
         # بدء المكونات
+        await self.reserve_watcher.start()
         await self.dashboard.start()
-        self.metrics.start_collecting()
+        await self.metrics.start_collecting()
         
         # المهام الرئيسية
         tasks = [
@@ -145,7 +233,7 @@ class FlashLoanArbitrageBot:
         except asyncio.CancelledError:
             logger.info("Bot tasks cancelled")
         except Exception as e:
-            logger.error(f"Bot error: {e}", exc_info=True)
+            logger.error("Bot error: %s", e, exc_info=True)
         finally:
             await self.stop()
     
@@ -172,35 +260,37 @@ class FlashLoanArbitrageBot:
                 self.last_scan_time = scan_time
                 
                 # الانتظار للدورة التالية
-                await asyncio.sleep(self.config['trading']['check_interval'])
+                await asyncio.sleep(self.trading_cfg.check_interval)
                 
             except Exception as e:
-                logger.error(f"Scanning error: {e}", exc_info=True)
+                logger.error("Scanning error: %s", e, exc_info=True)
                 await asyncio.sleep(5)
     
-    async def _process_opportunity(self, opportunity: Dict):
+    async def _process_opportunity(self, opportunity):
         """معالجة فرصة مراجحة"""
         try:
             # التحقق من الربحية بعد احتساب الغاز
             gas_cost = await self.executor_module.estimate_gas_cost()
-            net_profit = opportunity['expected_profit'] - gas_cost
+            net_profit = opportunity.expected_profit - gas_cost
             
-            if net_profit < self.config['trading']['min_profit']:
+            if net_profit < self.trading_cfg.min_profit:
                 return
             
             # إضافة حماية MEV
             protected_opportunity = await self.mev_protector.protect_opportunity(opportunity)
             
             # إضافة إلى قائمة الانتظار
-            trade_id = f"{opportunity['base_asset']}_{int(datetime.now().timestamp())}"
-            self.active_trades[trade_id] = {
+            trade_id = f"{opportunity.base_asset}_{int(datetime.now().timestamp())}"
+            trade = {
                 'id': trade_id,
                 'opportunity': protected_opportunity,
                 'status': 'pending',
                 'created_at': datetime.now(),
                 'estimated_profit': net_profit
             }
-            
+            self.active_trades[trade_id] = trade
+            await self._trade_queue.put((-net_profit, time.monotonic(), trade_id, trade))
+
             logger.info(f"✅ Queued trade {trade_id} - Estimated profit: {net_profit/1e18:.4f} MATIC")
             
         except Exception as e:
@@ -210,48 +300,48 @@ class FlashLoanArbitrageBot:
         """حلقة تنفيذ الصفقات"""
         while self.is_running:
             try:
-                # البحث عن أفضل صفقة قيد الانتظار
-                pending_trades = [
-                    t for t in self.active_trades.values() 
-                    if t['status'] == 'pending'
-                ]
-                
-                if pending_trades:
-                    # اختيار أفضل صفقة (أعلى ربح)
-                    best_trade = max(pending_trades, key=lambda x: x['estimated_profit'])
-                    
-                    # تغيير الحالة إلى جاري التنفيذ
-                    best_trade['status'] = 'executing'
-                    best_trade['execution_start'] = datetime.now()
-                    
-                    # تنفيذ الصفقة
-                    success = await self.executor_module.execute_trade(best_trade)
-                    
-                    # تحديث الحالة
-                    if success:
-                        best_trade['status'] = 'success'
-                        self.stats['trades_successful'] += 1
-                    else:
-                        best_trade['status'] = 'failed'
-                    
-                    best_trade['execution_end'] = datetime.now()
-                    best_trade['execution_time'] = (
-                        best_trade['execution_end'] - best_trade['execution_start']
-                    ).total_seconds()
-                    
-                    # نقل إلى التاريخ
-                    self.trade_history.append(best_trade)
-                    del self.active_trades[best_trade['id']]
-                    
-                    self.stats['trades_executed'] += 1
-                    
-                    # إرسال إنذار
-                    await self.alerts.send_trade_alert(best_trade)
-                
-                await asyncio.sleep(0.1)  # 100ms
-                
+                # انتظار أفضل صفقة (الطابور مرتب بالربح تنازلياً)
+                # مهلة قصيرة فقط للتحقق الدوري من إشارة الإيقاف
+                try:
+                    _, _, trade_id, best_trade = await asyncio.wait_for(
+                        self._trade_queue.get(), timeout=1.0
+                    )
+                except asyncio.TimeoutError:
+                    continue
+
+                if best_trade['status'] != 'pending':
+                    continue
+
+                # تغيير الحالة إلى جاري التنفيذ
+                best_trade['status'] = 'executing'
+                best_trade['execution_start'] = datetime.now()
+
+                # تنفيذ الصفقة
+                success = await self.executor_module.execute_trade(best_trade)
+
+                # تحديث الحالة
+                if success:
+                    best_trade['status'] = 'success'
+                    self.stats['trades_successful'] += 1
+                else:
+                    best_trade['status'] = 'failed'
+
+                best_trade['execution_end'] = datetime.now()
+                best_trade['execution_time'] = (
+                    best_trade['execution_end'] - best_trade['execution_start']
+                ).total_seconds()
+
+                # نقل إلى التاريخ
+                self.trade_history.append(best_trade)
+                self.active_trades.pop(trade_id, None)
+
+                self.stats['trades_executed'] += 1
+
+                # إرسال إنذار
+                await self.alerts.send_trade_alert(best_trade)
+
             except Exception as e:
-                logger.error(f"Execution error: {e}", exc_info=True)
+                logger.error("Execution error: %s", e, exc_info=True)
                 await asyncio.sleep(1)
     
     async def _run_monitoring_loop(self):
@@ -278,31 +368,36 @@ class FlashLoanArbitrageBot:
         """حلقة فحص صحة النظام"""
         while self.is_running:
             try:
-                # فحص اتصال RPC
-                mainnet_ok = self.w3_main.isConnected()
-                private_ok = self.w3_private.isConnected()
-                
-                if not mainnet_ok:
+                # جميع فحوصات RPC دفعة واحدة - التسلسل كان يجمع زمن
+                # رحلاتها الأربع ويجمد حلقة الأحداث طوالها
+                mainnet_ok, private_ok, balance, is_paused = await asyncio.gather(
+                    self.w3_main.is_connected(),
+                    asyncio.to_thread(self.w3_private.is_connected),
+                    self.w3_main.eth.get_balance(self.executor.address),
+                    self.contract.functions.paused().call(),
+                    return_exceptions=True
+                )
+
+                if isinstance(mainnet_ok, Exception) or not mainnet_ok:
                     logger.error("⚠️ Mainnet RPC connection lost")
                     await self.alerts.send_system_alert("Mainnet RPC disconnected")
-                
-                if not private_ok:
+
+                if isinstance(private_ok, Exception) or not private_ok:
                     logger.error("⚠️ Private RPC connection lost")
                     await self.alerts.send_system_alert("Private RPC disconnected")
-                
+
                 # فحص رصيد الغاز
-                balance = self.w3_main.eth.get_balance(self.executor.address)
-                if balance < self.config['trading']['min_executor_balance']:
+                if isinstance(balance, Exception):
+                    logger.error(f"Balance check failed: {balance}")
+                elif balance < self.config['trading']['min_executor_balance']:
                     logger.warning(f"⚠️ Low executor balance: {balance/1e18:.4f} MATIC")
                     await self.alerts.send_system_alert(f"Low executor balance: {balance/1e18:.2f} MATIC")
-                
+
                 # فحص العقد
-                try:
-                    is_paused = self.contract.functions.paused().call()
-                    if is_paused:
-                        logger.warning("⚠️ Contract is paused")
-                except Exception as e:
-                    logger.error(f"Contract check failed: {e}")
+                if isinstance(is_paused, Exception):
+                    logger.error(f"Contract check failed: {is_paused}")
+                elif is_paused:
+                    logger.warning("⚠️ Contract is paused")
                 
                 await asyncio.sleep(60)  # كل دقيقة
                 
@@ -313,10 +408,10 @@ class FlashLoanArbitrageBot:
     async def _check_alerts(self):
         """فحص الإنذارات"""
         # إنذارات الربح المرتفع
-        recent_trades = [
-            t for t in self.trade_history[-10:] 
-            if t['status'] == 'success'
-        ]
+        last_trades = list(islice(
+            self.trade_history, max(0, len(self.trade_history) - 10), None
+        ))
+        recent_trades = [t for t in last_trades if t['status'] == 'success']
         
         if recent_trades:
             total_profit = sum(t.get('actual_profit', 0) for t in recent_trades)
@@ -324,10 +419,7 @@ class FlashLoanArbitrageBot:
                 await self.alerts.send_profit_alert(total_profit, len(recent_trades))
         
         # إنذارات الفشل المتتالي
-        failed_trades = [
-            t for t in self.trade_history[-5:] 
-            if t['status'] == 'failed'
-        ]
+        failed_trades = [t for t in last_trades[-5:] if t['status'] == 'failed']
         
         if len(failed_trades) >= 3:
             await self.alerts.send_failure_alert(len(failed_trades))
@@ -366,8 +458,14 @@ class FlashLoanArbitrageBot:
         self.is_running = False
         
         # إيقاف المكونات
+        await self.reserve_watcher.stop()
         await self.dashboard.stop()
-        self.metrics.stop_collecting()
+        await self.metrics.stop_collecting()
+        await self.alerts.close()
+
+        # إغلاق جلسة HTTP المشتركة
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
         
         # حفظ البيانات
         self._save_data()
@@ -377,24 +475,36 @@ class FlashLoanArbitrageBot:
     def _save_data(self):
         """حفظ بيانات البوت"""
         try:
+            # قيم wei التراكمية تتجاوز 64 بت مع الوقت وorjson يرفضها كأعداد -
+            # تخزن كنصوص حتى لا يفشل الحفظ بعد ~18.4 MATIC ربح تراكمي
             data = {
-                'stats': self.stats,
+                'stats': {
+                    **self.stats,
+                    'total_profit': str(self.stats['total_profit']),
+                    'total_gas_cost': str(self.stats['total_gas_cost'])
+                },
                 'trade_history': [
                     {
                         'id': t['id'],
                         'status': t['status'],
-                        'created_at': t['created_at'].isoformat() if 'created_at' in t else None,
-                        'estimated_profit': t.get('estimated_profit', 0),
-                        'actual_profit': t.get('actual_profit', 0)
+                        'created_at': t.get('created_at'),  # orjson يسلسل datetime أصلياً
+                        'estimated_profit': str(t.get('estimated_profit', 0)),
+                        'actual_profit': str(t.get('actual_profit', 0))
                     }
-                    for t in self.trade_history[-100:]  # حفظ آخر 100 صفقة
+                    for t in list(self.trade_history)[-100:]  # حفظ آخر 100 صفقة
                 ],
                 'active_trades': list(self.active_trades.keys()),
-                'shutdown_time': datetime.now().isoformat()
+                'shutdown_time': datetime.now()
             }
-            
-            with open('logs/bot_state.json', 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+
+            # orjson أسرع بكثير من json القياسي ويكتب bytes مباشرة -
+            # يجعل حفظ الحالة رخيصاً بما يكفي لاستدعائه دورياً
+            with open('logs/bot_state.json', 'wb') as f:
+                f.write(orjson.dumps(
+                    data,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                    default=str
+                ))
             
             logger.info("💾 Bot state saved")
         except Exception as e:
@@ -2,12 +2,46 @@
 نظام حماية MEV ومنع Front-running
 """
 
-import hashlib
+import asyncio
+import logging
 import time
-from typing import Dict, Optional
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from eth_abi import encode as abi_encode
 from eth_account import Account, messages
 from web3 import Web3
 
+from crypto_kernels import tx_id, unique_nonce
+
+logger = logging.getLogger(__name__)
+
+
+# حد أقصى للمعاملات المعلقة المحفوظة - الأقدم يطرد أولاً
+MAX_PENDING_TXS = 4096
+
+
+@dataclass(slots=True)
+class PendingTx:
+    """سجل معاملة محمية - حقول ثابتة بدل dict لكل إدخال"""
+    opportunity: Any
+    created_at: float
+    status: str
+
+
+@lru_cache(maxsize=1024)
+def _path_hash(path: tuple) -> bytes:
+    """hash مسار التبادل - memoized لأن المسارات تتكرر كل دورة
+
+    العقد يتحقق بـ keccak256(abi.encodePacked(path)): عناصر مبطنة إلى
+    32 بايت فقط، دون كلمتي offset والطول في الترميز القياسي.
+    """
+    return Web3.keccak(b''.join(
+        bytes(12) + bytes.fromhex(address[2:]) for address in path
+    ))
+
 class MEVProtector:
     """
     حماية المعاملات من MEV وFront-running
@@ -20,61 +54,125 @@ class MEVProtector:
         # إعدادات MEV
         self.config = bot.config.get('mev_protection', {})
         
-        # ذاكرة التخزين المؤقت للمعاملات
-        self.pending_transactions = {}
+        # ذاكرة التخزين المؤقت للمعاملات - محدودة الحجم، ترتيب الإدراج
+        # يطابق ترتيب الزمن فالطرد من المقدمة يزيل الأقدم
+        self.pending_transactions: OrderedDict = OrderedDict()
         self.recent_blocks = []
+
+        # عناوين مراقبة محضرة بحروف صغيرة - المقارنة في حلقة الميمبول
+        # تصبح بحث مجموعة بدل .lower() وتخصيص لكل معاملة
+        self._watched_addrs = frozenset([bot.contract.address.lower()])
+        # نسخة numpy للمطابقة المتجهة على الميمبول كاملاً دفعة واحدة
+        self._watched_addrs_arr = np.array(sorted(self._watched_addrs), dtype='U42')
+
+        # بايتات عنوان المنفذ محضرة مسبقاً لنوى التجزئة
+        self._executor_addr_bytes = bytes.fromhex(bot.executor.address[2:])
         
         # إحصائيات
         self.stats = {
             'protected_txs': 0,
             'frontrunning_attempts': 0,
             'private_txs_sent': 0,
-            'avg_protection_time': 0
+            'avg_protection_time': 0.0
         }
+
+        # معامل المتوسط الأسي لزمن الحماية
+        self._alpha = 0.1
+
+        # بنى EIP-712 الثابتة - hash النطاق وtypehash البنية يحسبان مرة واحدة،
+        # فيتبقى على مسار التوقيع keccak واحد للبنية + توقيع ECDSA
+        domain_typehash = Web3.keccak(
+            b'EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)'
+        )
+        self._domain_hash = Web3.keccak(abi_encode(
+            ['bytes32', 'bytes32', 'bytes32', 'uint256', 'address'],
+            [
+                domain_typehash,
+                Web3.keccak(b'FlashLoanArbitrage'),
+                Web3.keccak(b'1.0.0'),
+                137,  # Polygon
+                bot.contract.address
+            ]
+        ))
+        self._struct_typehash = Web3.keccak(
+            b'ExecuteFlashLoan(uint8 strategy,address loanAsset,uint256 loanAmount,'
+            b'address dexRouter1,address dexRouter2,bytes32 buyPathHash,'
+            b'bytes32 sellPathHash,uint256 minOutBuy,uint256 minOutSell,'
+            b'uint256 minProfit,address profitToken,uint256 nonce,'
+            b'uint256 deadline,uint256 maxGasPrice)'
+        )
+        self._struct_types = [
+            'bytes32', 'uint8', 'address', 'uint256', 'address', 'address',
+            'bytes32', 'bytes32', 'uint256', 'uint256', 'uint256', 'address',
+            'uint256', 'uint256', 'uint256'
+        ]
     
-    async def protect_opportunity(self, opportunity: Dict) -> Dict:
+    async def protect_opportunity(self, opportunity):
         """إضافة حماية MEV لفرصة المراجحة"""
-        protected_opportunity = opportunity.copy()
-        
-        # 1. إضافة Nonce فريد
-        protected_opportunity['nonce'] = self._generate_unique_nonce(opportunity)
-        
-        # 2. إضافة timestamp لتجنب إعادة الاستخدام
-        protected_opportunity['timestamp'] = int(time.time())
-        
-        # 3. إضافة حاجز سعر الغاز
-        protected_opportunity['max_gas_price'] = self._calculate_max_gas_price()
-        
-        # 4. إنشاء توقيع EIP-712
-        signature = await self._create_eip712_signature(protected_opportunity)
-        protected_opportunity['signature'] = signature
-        
-        # 5. إضافة hash للمعاملة
-        tx_hash = self._calculate_tx_hash(protected_opportunity)
-        protected_opportunity['tx_hash'] = tx_hash
-        
+        protection_start = time.monotonic()
+
+        # 1. Nonce فريد
+        nonce = self._generate_unique_nonce(opportunity)
+
+        # 2. timestamp لتجنب إعادة الاستخدام، والمهلة تشتق منه مرة واحدة
+        # حتى يوقع ويرسل نفس الرقم (إعادة حسابها عند الإرسال تبطل التوقيع)
+        timestamp = int(time.time())
+        deadline = timestamp + 300  # 5 دقائق
+
+        # 3. حاجز سعر الغاز - لا مجال لموازاته مع التوقيع لأن maxGasPrice
+        # ضمن الحقول الموقعة، والكاش ذو مهلة الثانية يمتص كلفة الطلب أصلاً
+        max_gas_price = await self._calculate_max_gas_price()
+
+        # 4. توقيع EIP-712
+        signature = await self._create_eip712_signature(
+            opportunity, nonce, max_gas_price, deadline
+        )
+
+        # 5. hash المعاملة
+        tx_hash = self._calculate_tx_hash(opportunity, nonce, timestamp)
+
+        # الفرصة مجمدة - تخصيص replace واحد بدل نسخة وخمس كتابات
+        protected_opportunity = replace(
+            opportunity,
+            nonce=nonce,
+            timestamp=timestamp,
+            deadline=deadline,
+            max_gas_price=max_gas_price,
+            signature=signature,
+            tx_hash=tx_hash
+        )
+
+
         # تسجيل المعاملة المعلقة
-        self.pending_transactions[tx_hash] = {
-            'opportunity': protected_opportunity,
-            'created_at': time.time(),
-            'status': 'protected'
-        }
+        if len(self.pending_transactions) >= MAX_PENDING_TXS:
+            self.pending_transactions.popitem(last=False)
+        self.pending_transactions[tx_hash] = PendingTx(
+            opportunity=protected_opportunity,
+            created_at=time.time(),
+            status='protected'
+        )
         
         self.stats['protected_txs'] += 1
-        
+        a = self._alpha
+        self.stats['avg_protection_time'] = (
+            a * (time.monotonic() - protection_start)
+            + (1 - a) * self.stats['avg_protection_time']
+        )
+
         return protected_opportunity
     
-    def _generate_unique_nonce(self, opportunity: Dict) -> int:
+    def _generate_unique_nonce(self, opportunity) -> int:
         """إنشاء nonce فريد بناءً على الفرصة"""
-        # استخدام hash للفرصة + timestamp
-        data = f"{opportunity['base_asset']}{opportunity['quote_asset']}{time.time_ns()}"
-        hash_bytes = hashlib.sha256(data.encode()).digest()
-        return int.from_bytes(hash_bytes[:8], 'big')
+        return unique_nonce(
+            bytes.fromhex(opportunity.base_asset[2:]),
+            bytes.fromhex(opportunity.quote_asset[2:]),
+            time.time_ns()
+        )
     
-    def _calculate_max_gas_price(self) -> int:
+    async def _calculate_max_gas_price(self) -> int:
         """حساب الحد الأقصى لسعر الغاز"""
-        current_gas = self.w3.eth.gas_price
-        
+        current_gas = await self.bot.cached_gas_price()
+
         # إضافة نسبة أمان (20%)
         max_gas = int(current_gas * 1.2)
         
@@ -83,106 +181,80 @@ class MEVProtector:
         
         return min(max_gas, absolute_max)
     
-    async def _create_eip712_signature(self, opportunity: Dict) -> str:
-        """إنشاء توقيع EIP-712"""
-        # إعداد Domain Separator
-        domain = {
-            'name': 'FlashLoanArbitrage',
-            'version': '1.0.0',
-            'chainId': 137,  # Polygon
-            'verifyingContract': self.bot.contract.address
-        }
-        
-        # أنواع الرسالة
-        types = {
-            'ExecuteFlashLoan': [
-                {'name': 'strategy', 'type': 'uint8'},
-                {'name': 'loanAsset', 'type': 'address'},
-                {'name': 'loanAmount', 'type': 'uint256'},
-                {'name': 'dexRouter1', 'type': 'address'},
-                {'name': 'dexRouter2', 'type': 'address'},
-                {'name': 'buyPathHash', 'type': 'bytes32'},
-                {'name': 'sellPathHash', 'type': 'bytes32'},
-                {'name': 'minOutBuy', 'type': 'uint256'},
-                {'name': 'minOutSell', 'type': 'uint256'},
-                {'name': 'minProfit', 'type': 'uint256'},
-                {'name': 'profitToken', 'type': 'address'},
-                {'name': 'nonce', 'type': 'uint256'},
-                {'name': 'deadline', 'type': 'uint256'},
-                {'name': 'maxGasPrice', 'type': 'uint256'}
-            ]
-        }
-        
-        # البيانات
-        message = {
-            'strategy': 0,  # ARBITRAGE
-            'loanAsset': opportunity['base_asset'],
-            'loanAmount': opportunity['trade_size'],
-            'dexRouter1': opportunity['buy_router'],
-            'dexRouter2': opportunity['sell_router'],
-            'buyPathHash': Web3.keccak(abi.encode(opportunity['buy_path'])),
-            'sellPathHash': Web3.keccak(abi.encode(opportunity['sell_path'])),
-            'minOutBuy': opportunity.get('min_out_buy', opportunity['trade_size']),
-            'minOutSell': opportunity.get('min_out_sell', opportunity['trade_size']),
-            'minProfit': self.bot.config['trading']['min_profit'],
-            'profitToken': opportunity['base_asset'],
-            'nonce': opportunity['nonce'],
-            'deadline': int(time.time() + 300),  # 5 دقائق
-            'maxGasPrice': opportunity['max_gas_price']
-        }
-        
-        # التوقيع
-        signed_message = self.bot.owner.sign_typed_data(
-            domain_data=domain,
-            message_types=types,
-            message_data=message
+    async def _create_eip712_signature(self, opportunity, nonce: int,
+                                       max_gas_price: int, deadline: int) -> str:
+        """إنشاء توقيع EIP-712 على الـ digest مباشرة"""
+        # hash البنية فقط يتغير بين الفرص - النطاق محسوب في __init__
+        struct_hash = Web3.keccak(abi_encode(self._struct_types, [
+            self._struct_typehash,
+            opportunity.strategy,
+            opportunity.base_asset,
+            opportunity.trade_size,
+            opportunity.buy_router,
+            opportunity.sell_router,
+            _path_hash(tuple(opportunity.buy_path)),
+            _path_hash(tuple(opportunity.sell_path)),
+            opportunity.min_out_buy or opportunity.trade_size,
+            opportunity.min_out_sell or opportunity.trade_size,
+            self.bot.trading_cfg.min_profit,
+            opportunity.base_asset,
+            nonce,
+            deadline,
+            max_gas_price
+        ]))
+        digest = Web3.keccak(b'\x19\x01' + self._domain_hash + struct_hash)
+
+        # التوقيع - ECDSA مقيد بالمعالج، ينفذ في خيط حتى لا يحجب حلقة الأحداث
+        signed_message = await asyncio.to_thread(
+            Account._sign_hash, digest, self.bot.owner.key
         )
-        
+
         return signed_message.signature.hex()
     
-    def _calculate_tx_hash(self, opportunity: Dict) -> str:
+    def _calculate_tx_hash(self, opportunity, nonce: int, timestamp: int) -> str:
         """حساب hash فريد للمعاملة"""
-        data = (
-            f"{opportunity['base_asset']}"
-            f"{opportunity['trade_size']}"
-            f"{opportunity['nonce']}"
-            f"{opportunity['timestamp']}"
-            f"{self.bot.executor.address}"
+        return tx_id(
+            bytes.fromhex(opportunity.base_asset[2:]),
+            opportunity.trade_size,
+            nonce,
+            timestamp,
+            self._executor_addr_bytes
         )
-        return hashlib.sha256(data.encode()).hexdigest()
     
     async def monitor_for_frontrunning(self):
         """مراقبة محاولات Front-running"""
         try:
             # الحصول على أحدث المعاملات في الميمبول
             pending_txs = self.w3.eth.get_block('pending', full_transactions=True)
-            
-            for tx in pending_txs.transactions:
-                # التحقق مما إذا كانت المعاملة تتنافس مع معاملاتنا
-                if self._is_competing_transaction(tx):
-                    self.stats['frontrunning_attempts'] += 1
-                    
-                    # تسجيل محاولة Front-running
-                    logger.warning(f"⚠️ Front-running attempt detected: {tx.hash.hex()}")
-                    
-                    # يمكن إضافة منطق للتعامل مع Front-running هنا
-                    # مثل زيادة سعر الغاز أو إلغاء المعاملة
+            transactions = pending_txs.transactions
+            if not transactions:
+                return
+
+            # مطابقة العناوين متجهة - حلقة C واحدة على الميمبول كاملاً
+            # بدل مقارنة Python لكل معاملة (آلاف المعاملات على Polygon)
+            tos = np.array(
+                [tx.to.lower() if tx.to else '' for tx in transactions],
+                dtype='U42'
+            )
+            mask = np.isin(tos, self._watched_addrs_arr)
+
+            for idx in np.nonzero(mask)[0]:
+                tx = transactions[idx]
+                self.stats['frontrunning_attempts'] += 1
+
+                # تسجيل محاولة Front-running
+                logger.warning(f"⚠️ Front-running attempt detected: {tx.hash.hex()}")
+
+                # يمكن إضافة منطق للتعامل مع Front-running هنا
+                # مثل زيادة سعر الغاز أو إلغاء المعاملة
         
         except Exception as e:
-            logger.debug(f"Error monitoring frontrunning: {e}")
+            logger.debug("Error monitoring frontrunning: %s", e)
     
     def _is_competing_transaction(self, tx) -> bool:
         """التحقق مما إذا كانت المعاملة تتنافس مع معاملاتنا"""
-        # التحقق من عنوان المتلقي
-        if tx.to and tx.to.lower() == self.bot.contract.address.lower():
-            return True
-        
-        # التحقق من بيانات المعاملة
-        if tx.input and len(tx.input) > 10:
-            # يمكن إضافة تحليل أكثر تعقيداً هنا
-            pass
-        
-        return False
+        to = tx.to
+        return bool(to) and to.lower() in self._watched_addrs
     
     async def send_private_transaction(self, raw_tx: str) -> Optional[str]:
         """إرسال معاملة خاصة عبر Private RPC"""
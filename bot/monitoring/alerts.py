@@ -2,8 +2,17 @@
 نظام الإنذارات
 """
 
-import requests
-from typing import Dict
+import asyncio
+import logging
+import aiohttp
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# عند دمج إنذارات متزامنة يؤخذ المستوى الأعلى خطورة
+_LEVEL_PRIORITY = {'success': 0, 'info': 1, 'warning': 2, 'error': 3, 'critical': 4}
+
 
 class AlertSystem:
     """
@@ -22,6 +31,29 @@ class AlertSystem:
         if self.telegram_enabled:
             self.telegram_token = self.config['telegram']['token']
             self.telegram_chat_id = self.config['telegram']['chat_id']
+
+        # جلسة HTTP مشتركة (تنشأ عند أول إنذار) - اتصالات مجمعة بلا حظر للحلقة
+        self._http: Optional[aiohttp.ClientSession] = None
+
+        # طابور الإنذارات - المستهلك يدمج دفعات الإنذارات في رسالة واحدة
+        # لكل قناة بدل POST لكل صفقة (أقل طلبات وأقل عرضة لـ 429)
+        self._alert_q: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        self._alert_task: Optional[asyncio.Task] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """إنشاء جلسة HTTP المشتركة عند الحاجة"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        return self._http
+
+    async def close(self):
+        """إيقاف مستهلك الطابور وإغلاق جلسة HTTP عند إيقاف البوت"""
+        if self._alert_task and not self._alert_task.done():
+            self._alert_task.cancel()
+        if self._http and not self._http.closed:
+            await self._http.close()
     
     async def send_trade_alert(self, trade: Dict):
         """إرسال إنذار بخصوص الصفقة"""
@@ -69,19 +101,55 @@ class AlertSystem:
             )
     
     async def _send_alert(self, message: str, level: str):
-        """إرسال الإنذار عبر جميع القنوات"""
+        """وضع الإنذار في الطابور - الإرسال الفعلي عبر المستهلك المدمج"""
+        if self._alert_task is None or self._alert_task.done():
+            self._alert_task = asyncio.create_task(self._alert_consumer())
+
+        try:
+            self._alert_q.put_nowait((message, level))
+        except asyncio.QueueFull:
+            logger.warning("Alert queue full, dropping alert")
+
+    async def _alert_consumer(self):
+        """دمج الإنذارات المتزامنة خلال نافذة 250ms في رسالة واحدة لكل قناة"""
+        while True:
+            message, level = await self._alert_q.get()
+            items = [(message, level)]
+
+            # نافذة التجميع - ما يصل خلالها ينضم لنفس الدفعة
+            await asyncio.sleep(0.25)
+            while True:
+                try:
+                    items.append(self._alert_q.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            if len(items) == 1:
+                await self._dispatch_alert(message, level)
+            else:
+                combined = "\n---\n".join(m for m, _ in items)
+                top_level = max(items, key=lambda i: _LEVEL_PRIORITY.get(i[1], 0))[1]
+                await self._dispatch_alert(combined, top_level)
+
+    async def _dispatch_alert(self, message: str, level: str):
+        """إرسال الإنذار عبر جميع القنوات بالتوازي"""
+        tasks = []
+
         # Telegram
         if self.telegram_enabled:
-            await self._send_telegram_alert(message)
-        
+            tasks.append(self._send_telegram_alert(message))
+
         # Discord
         if self.discord_enabled:
-            await self._send_discord_alert(message, level)
-        
+            tasks.append(self._send_discord_alert(message, level))
+
         # Email
         if self.email_enabled:
-            await self._send_email_alert(message, level)
-        
+            tasks.append(self._send_email_alert(message, level))
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
         # التسجيل المحلي
         logger.info(f"ALERT: {message}")
     
@@ -95,8 +163,8 @@ class AlertSystem:
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(url, json=payload)
-            return response.status_code == 200
+            async with self._get_session().post(url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Telegram alert failed: {e}")
             return False
@@ -123,8 +191,8 @@ class AlertSystem:
             }
             
             payload = {'embeds': [embed]}
-            response = requests.post(webhook_url, json=payload)
-            return response.status_code == 204
+            async with self._get_session().post(webhook_url, json=payload) as response:
+                return response.status == 204
         except Exception as e:
             logger.error(f"Discord alert failed: {e}")
             return False
@@ -2,9 +2,13 @@
 مجمع المقاييس لـ Prometheus
 """
 
+import logging
 import time
-from typing import Dict
-from prometheus_client import start_http_server, Counter, Gauge, Histogram
+from typing import Dict, Optional
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
 
 class MetricsCollector:
     """
@@ -26,13 +30,38 @@ class MetricsCollector:
         self.active_trades = Gauge('bot_active_trades', 'Number of active trades')
         self.scan_duration = Histogram('bot_scan_duration_seconds', 'Scan duration in seconds')
         self.trade_execution_time = Histogram('bot_trade_execution_time_seconds', 'Trade execution time')
-        
-        # بدء خادم المقاييس
-        start_http_server(8000)
-    
-    def start_collecting(self):
-        """بدء جمع المقاييس"""
+
+        # آخر قيم للعدادات - التحديث بالفرق (inc) بدل الكتابة فوق القيمة الداخلية
+        self._last_counts = {
+            'total_scans': 0,
+            'opportunities_found': 0,
+            'trades_executed': 0,
+            'trades_successful': 0
+        }
+        self._last_snapshot = None
+
+        # خادم المقاييس - aiohttp على نفس حلقة الأحداث بدل خيط wsgiref
+        self._metrics_port = bot.config.get('monitoring', {}).get('metrics_port', 8000)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _serve_metrics(self, request: web.Request) -> web.Response:
+        """نقطة /metrics لسحب Prometheus"""
+        return web.Response(
+            body=generate_latest(),
+            headers={'Content-Type': CONTENT_TYPE_LATEST}
+        )
+
+    async def start_collecting(self):
+        """بدء جمع المقاييس وخادم /metrics"""
         self.is_collecting = True
+
+        app = web.Application()
+        app.router.add_get('/metrics', self._serve_metrics)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, port=self._metrics_port)
+        await site.start()
     
     def update_metrics(self, stats: Dict, active_trades: Dict):
         """تحديث جميع المقاييس"""
@@ -40,21 +69,41 @@ class MetricsCollector:
             # الوقت التشغيلي
             uptime = (time.time() - stats['uptime_start'].timestamp())
             self.bot_uptime.set(uptime)
-            
-            # الإحصائيات
-            self.total_scans._value.set(stats.get('total_scans', 0))
-            self.opportunities_found._value.set(stats.get('opportunities_found', 0))
-            self.trades_executed._value.set(stats.get('trades_executed', 0))
-            self.trades_successful._value.set(stats.get('trades_successful', 0))
-            
+
+            # لا عمل في الدورات الخاملة - التحديث فقط عند تغير الإحصائيات
+            snapshot = (
+                stats.get('total_scans', 0),
+                stats.get('opportunities_found', 0),
+                stats.get('trades_executed', 0),
+                stats.get('trades_successful', 0),
+                stats.get('total_profit', 0),
+                stats.get('total_gas_cost', 0),
+                len(active_trades)
+            )
+            if snapshot == self._last_snapshot:
+                return
+            self._last_snapshot = snapshot
+
+            # العدادات تتقدم بالفرق - inc() هو الواجهة الصحيحة لعداد متزايد
+            for name, metric in (
+                ('total_scans', self.total_scans),
+                ('opportunities_found', self.opportunities_found),
+                ('trades_executed', self.trades_executed),
+                ('trades_successful', self.trades_successful)
+            ):
+                delta = stats.get(name, 0) - self._last_counts[name]
+                if delta > 0:
+                    metric.inc(delta)
+                    self._last_counts[name] = stats.get(name, 0)
+
             # الأرباح والتكاليف
             self.total_profit.set(stats.get('total_profit', 0))
             self.total_gas_cost.set(stats.get('total_gas_cost', 0))
             self.net_profit.set(stats.get('total_profit', 0) - stats.get('total_gas_cost', 0))
-            
+
             # الصفقات النشطة
             self.active_trades.set(len(active_trades))
-            
+
         except Exception as e:
             logger.error(f"Error updating metrics: {e}")
     
@@ -66,6 +115,9 @@ class MetricsCollector:
         """تسجيل تنفيذ الصفقة"""
         self.trade_execution_time.observe(duration)
     
-    def stop_collecting(self):
-        """إيقاف جمع المقاييس"""
+    async def stop_collecting(self):
+        """إيقاف جمع المقاييس وإغلاق خادم /metrics"""
         self.is_collecting = False
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
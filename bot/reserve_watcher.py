@@ -0,0 +1,238 @@
+"""
+مراقب احتياطيات المجمعات عبر WebSocket
+
+بدلاً من استطلاع getAmountsOut لكل رواتر في كل دورة، نجلب الاحتياطيات
+مرة واحدة عند البدء ونشترك في أحداث Sync؛ بعدها تُحسب الأسعار محلياً
+من الذاكرة بمعادلة x*y=k دون أي طلب RPC في مسار المسح.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from eth_abi import decode as abi_decode
+from web3 import AsyncWeb3
+from web3.providers import WebsocketProviderV2
+
+from scanner_kernels import get_amount_out
+
+logger = logging.getLogger(__name__)
+
+# keccak("Sync(uint112,uint112)")
+SYNC_TOPIC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"
+
+# ABI مبسطة للدوال المطلوبة فقط
+ROUTER_FACTORY_ABI = [
+    {
+        "inputs": [],
+        "name": "factory",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+FACTORY_ABI = [
+    {
+        "inputs": [
+            {"internalType": "address", "name": "tokenA", "type": "address"},
+            {"internalType": "address", "name": "tokenB", "type": "address"}
+        ],
+        "name": "getPair",
+        "outputs": [{"internalType": "address", "name": "pair", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+PAIR_ABI = [
+    {
+        "inputs": [],
+        "name": "getReserves",
+        "outputs": [
+            {"internalType": "uint112", "name": "reserve0", "type": "uint112"},
+            {"internalType": "uint112", "name": "reserve1", "type": "uint112"},
+            {"internalType": "uint32", "name": "blockTimestampLast", "type": "uint32"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "token0",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class ReserveWatcher:
+    """
+    صيانة نسخة محلية من احتياطيات المجمعات عبر أحداث Sync
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.ws_url = bot.config['rpc'].get('ws', '')
+        self.enabled = bool(bot.config['rpc'].get('ws'))
+
+        # (router, base, quote) -> (عنوان المجمع، هل base هو token0)
+        self.pair_index: Dict[Tuple[str, str, str], Tuple[str, bool]] = {}
+
+        # عنوان المجمع -> (reserve0, reserve1)
+        self.reserves: Dict[str, Tuple[int, int]] = {}
+
+        self.is_ready = False
+        self._task: Optional[asyncio.Task] = None
+
+        # الإحصائيات
+        self.stats = {
+            'pools_tracked': 0,
+            'sync_events': 0,
+            'reconnects': 0
+        }
+
+    async def start(self):
+        """اكتشاف المجمعات وجلب الاحتياطيات الأولية ثم بدء الاشتراك"""
+        if not self.enabled:
+            logger.info("Reserve watcher disabled (no rpc.ws configured)")
+            return
+
+        await self._discover_pools()
+
+        if not self.pair_index:
+            logger.warning("Reserve watcher found no V2 pools, staying disabled")
+            self.enabled = False
+            return
+
+        self.stats['pools_tracked'] = len(self.reserves)
+        self.is_ready = True
+        self._task = asyncio.create_task(self._subscription_loop())
+        logger.info(f"📡 Reserve watcher tracking {len(self.reserves)} pools")
+
+    async def stop(self):
+        """إيقاف مهمة الاشتراك"""
+        self.is_ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _discover_pools(self):
+        """تحديد عناوين المجمعات لكل (رواتر، زوج) وجلب الاحتياطيات الأولية"""
+        w3 = self.bot.w3_main
+        routers = self.bot.config['trading']['enabled_routers']
+        pairs = self.bot.config['trading']['pairs']
+
+        for router_address in routers:
+            # الرواتر غير المتوافقة مع V2 (مثل Uniswap V3) تُتخطى بهدوء
+            try:
+                router = w3.eth.contract(address=router_address, abi=ROUTER_FACTORY_ABI)
+                factory_address = await router.functions.factory().call()
+            except Exception as e:
+                logger.debug("Router %s has no V2 factory: %s", router_address, e)
+                continue
+
+            factory = w3.eth.contract(address=factory_address, abi=FACTORY_ABI)
+
+            for pair_cfg in pairs:
+                base, quote = pair_cfg['base'], pair_cfg['quote']
+                try:
+                    pool_address = await factory.functions.getPair(base, quote).call()
+                    if pool_address == ZERO_ADDRESS:
+                        continue
+
+                    pool = w3.eth.contract(address=pool_address, abi=PAIR_ABI)
+                    token0 = await pool.functions.token0().call()
+                    reserve0, reserve1, _ = await pool.functions.getReserves().call()
+                except Exception as e:
+                    logger.debug(
+                        f"Failed to load pool for {base}/{quote} on {router_address}: {e}"
+                    )
+                    continue
+
+                base_is_token0 = token0.lower() == base.lower()
+                self.pair_index[(router_address, base, quote)] = (pool_address, base_is_token0)
+                self.reserves[pool_address.lower()] = (reserve0, reserve1)
+
+    async def _subscription_loop(self):
+        """الاشتراك في أحداث Sync وتحديث الاحتياطيات عند وصولها"""
+        watched = [address for address, _ in self.pair_index.values()]
+
+        while True:
+            try:
+                async with AsyncWeb3.persistent_websocket(
+                    WebsocketProviderV2(self.ws_url)
+                ) as w3_ws:
+                    await w3_ws.eth.subscribe('logs', {
+                        'address': watched,
+                        'topics': [SYNC_TOPIC]
+                    })
+
+                    async for message in w3_ws.ws.process_subscriptions():
+                        log = message['result']
+                        reserve0, reserve1 = abi_decode(
+                            ['uint112', 'uint112'], log['data']
+                        )
+                        self.reserves[log['address'].lower()] = (reserve0, reserve1)
+                        self.stats['sync_events'] += 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['reconnects'] += 1
+                logger.warning(f"Reserve subscription dropped, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    def get_price(self, router_address: str, base: str, quote: str,
+                  amount_in: int, fee_bps: int) -> Optional[int]:
+        """حساب سعر getAmountsOut محلياً من الاحتياطيات المخزنة"""
+        entry = self.pair_index.get((router_address, base, quote))
+        if entry is None:
+            return None
+
+        pool_address, base_is_token0 = entry
+        reserves = self.reserves.get(pool_address.lower())
+        if reserves is None:
+            return None
+
+        reserve0, reserve1 = reserves
+        if base_is_token0:
+            return get_amount_out(amount_in, reserve0, reserve1, fee_bps)
+        return get_amount_out(amount_in, reserve1, reserve0, fee_bps)
+
+    def build_price_map(self, trading_pairs: List[Dict], routers: List[str],
+                        amount_in: int, fee_bps: int) -> Optional[Dict]:
+        """بناء خريطة أسعار كاملة من الذاكرة - يعيد None عند نقص التغطية
+
+        الرسوم تمرر من الإعدادات حتى تبقى أسعار الأحداث مطابقة لمسار
+        getAmountsOut الاحتياطي في الماسح مهما تغير dex_fee_percent.
+        """
+        if not self.is_ready:
+            return None
+
+        price_map = {}
+        for pair_cfg in trading_pairs:
+            base, quote = pair_cfg['base'], pair_cfg['quote']
+            entries = []
+            for router_address in routers:
+                price = self.get_price(router_address, base, quote, amount_in, fee_bps)
+                if price:
+                    entries.append((router_address, price))
+
+            # نحتاج سعرين على الأقل لكل زوج وإلا فالمقارنة غير ممكنة
+            if len(entries) < 2:
+                return None
+            price_map[(base, quote)] = entries
+
+        return price_map
+
+    def get_stats(self) -> Dict:
+        """الحصول على إحصائيات المراقب"""
+        return self.stats
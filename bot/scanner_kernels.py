@@ -0,0 +1,38 @@
+"""
+نوى الحساب الساخنة للماسح
+
+دوال صغيرة نقية تستدعى آلاف المرات في الثانية عبر الأزواج والرواتر.
+مكتوبة بتوقيعات ثابتة الأنواع بحيث يمكن ترجمتها إلى امتداد C عبر
+mypyc (python -m mypyc bot/scanner_kernels.py) أو cythonize دون أي
+تعديل؛ عند غياب النسخة المترجمة تعمل كبايثون عادي.
+"""
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int,
+                   fee_bps: int = 30) -> int:
+    """معادلة Uniswap V2 (x*y=k) بحساب صحيح كامل"""
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * (10000 - fee_bps)
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * 10000 + amount_in_with_fee
+    return numerator // denominator
+
+
+def price_diff_percent(price1: int, price2: int) -> float:
+    """النسبة المئوية لفرق السعر بين سعرين بوحدة wei"""
+    if price1 <= 0 or price2 <= 0:
+        return 0.0
+    if price1 < price2:
+        return (price2 - price1) / price1
+    return (price1 - price2) / price2
+
+
+def expected_profit_wei(trade_size: int, buy_price: int, sell_price: int,
+                        fee_bps: int) -> int:
+    """الربح المتوقع بوحدة wei بقسمة صحيحة كما في العقد"""
+    if buy_price <= 0:
+        return 0
+    sell_amount_wei = trade_size * sell_price // buy_price
+    sell_amount_wei = sell_amount_wei * (10000 - fee_bps) // 10000
+    return sell_amount_wei - trade_size
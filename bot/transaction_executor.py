@@ -2,27 +2,71 @@
 منفذ المعاملات
 """
 
+import asyncio
+import logging
 import time
-from typing import Dict, Optional
-from web3 import Web3
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from eth_abi import encode as abi_encode
+from web3 import AsyncWeb3, Web3
+from web3.providers import WebsocketProviderV2
 from eth_account import Account
 
+logger = logging.getLogger(__name__)
+
+# selector ثابت - يحسب مرة واحدة عند تحميل الوحدة
+EXECUTE_FLASHLOAN_SELECTOR = Web3.keccak(
+    text="executeFlashLoan("
+         "(uint8,address,uint256,address,address,address[],address[],"
+         "uint256,uint256,uint256,address,uint256,uint256,uint256),bytes)"
+)[:4]
+EXECUTE_FLASHLOAN_TYPES = [
+    '(uint8,address,uint256,address,address,address[],address[],'
+    'uint256,uint256,uint256,address,uint256,uint256,uint256)',
+    'bytes'
+]
+
+# حد أقصى للتنفيذات المتعقبة - الأقدم (الأقرب لانتهاء مهلته) يطرد أولاً
+MAX_ACTIVE_EXECUTIONS = 4096
+
+
+@dataclass(slots=True)
+class ActiveExecution:
+    """سجل تنفيذ جارٍ - حقول ثابتة بدل dict لكل إدخال"""
+    trade: Dict
+    started_at: float
+
+
 class TransactionExecutor:
     """
     تنفيذ المعاملات على الشبكة
     """
-    
+
     def __init__(self, bot):
         self.bot = bot
         self.w3_main = bot.w3_main
         self.w3_private = bot.w3_private
-        
+
         # الإعدادات
         self.config = bot.config.get('execution', {})
-        
+
         # الحالة
         self.execution_queue = []
-        self.active_executions = {}
+        self.active_executions: OrderedDict = OrderedDict()
+
+        # كاش الإيصالات: جلب واحد لكل معاملة يخدم كل المستهلكين
+        self._receipts: Dict[str, Any] = {}
+        self._receipt_events: Dict[str, asyncio.Event] = {}
+        self._receipt_task: Optional[asyncio.Task] = None
+
+        # WebSocket (اختياري) - الاستطلاع يقاد برؤوس البلوكات بدل مؤقت 0.5 ثانية
+        self._ws_url = bot.config['rpc'].get('ws') or ''
+
+        # عداد nonce محلي - يجهز من العقدة عند أول استخدام ثم يتقدم محلياً،
+        # فيختفي طلب get_transaction_count من مسار البناء والتوقيع
+        self._nonce: Optional[int] = None
+        self._nonce_lock = asyncio.Lock()
         
         # الإحصائيات
         self.stats = {
@@ -31,8 +75,11 @@ class TransactionExecutor:
             'failed_executions': 0,
             'total_gas_used': 0,
             'total_gas_cost': 0,
-            'avg_execution_time': 0
+            'avg_execution_time': 0.0
         }
+
+        # معامل المتوسط الأسي - يعكس الأداء الحديث ويحدث بضرب وجمع فقط
+        self._alpha = 0.1
     
     async def execute_trade(self, trade: Dict) -> bool:
         """تنفيذ صفقة Flash Loan"""
@@ -44,8 +91,10 @@ class TransactionExecutor:
             # 1. بناء المعاملة
             tx_data = await self._build_transaction(opportunity)
             
-            # 2. توقيع المعاملة
-            signed_tx = self.bot.executor.sign_transaction(tx_data)
+            # 2. توقيع المعاملة - ECDSA في خيط منفصل حتى يستمر المسح أثناءه
+            signed_tx = await asyncio.to_thread(
+                self.bot.executor.sign_transaction, tx_data
+            )
             
             # 3. إرسال المعاملة (خاصة أو عادية)
             if self.config.get('use_private_tx', True):
@@ -54,10 +103,17 @@ class TransactionExecutor:
                 tx_hash = await self._send_regular_transaction(signed_tx.rawTransaction)
             
             if not tx_hash:
+                # المعاملة لم تصل للعقدة - العداد المحلي تقدم بلا مقابل
+                await self._resync_nonce()
                 return False
             
             trade['tx_hash'] = tx_hash
-            self.active_executions[tx_hash] = trade
+            if len(self.active_executions) >= MAX_ACTIVE_EXECUTIONS:
+                self.active_executions.popitem(last=False)
+            self.active_executions[tx_hash] = ActiveExecution(
+                trade=trade,
+                started_at=start_time
+            )
             
             # 4. انتظار التنفيذ
             success = await self._wait_for_execution(tx_hash)
@@ -79,59 +135,90 @@ class TransactionExecutor:
                 trade['status'] = 'failed'
             
             self.stats['total_executions'] += 1
+            a = self._alpha
             self.stats['avg_execution_time'] = (
-                (self.stats['avg_execution_time'] * (self.stats['total_executions'] - 1) + execution_time) 
-                / self.stats['total_executions']
+                a * execution_time + (1 - a) * self.stats['avg_execution_time']
             )
             
             # تحديث الرصيد المتوقع
-            self._update_gas_stats(tx_hash)
+            await self._update_gas_stats(tx_hash)
             
             # تنظيف الذاكرة
             if tx_hash in self.active_executions:
                 del self.active_executions[tx_hash]
+            self._receipts.pop(tx_hash, None)
             
             return success
             
         except Exception as e:
-            logger.error(f"Trade execution failed: {e}", exc_info=True)
+            logger.error("Trade execution failed: %s", e, exc_info=True)
             return False
     
     async def _build_transaction(self, opportunity: Dict) -> Dict:
         """بناء معاملة Flash Loan"""
+        # جلب سعر الغاز مرة واحدة لكل الاستخدامات أدناه (كاش مشترك مع MEVProtector)
+        gas_price = await self.bot.cached_gas_price()
+
         # إعداد معلمات العقد
         params = (
-            opportunity.get('strategy', 0),  # strategy
-            opportunity['base_asset'],       # loanAsset
-            opportunity['trade_size'],       # loanAmount
-            opportunity['buy_router'],       # dexRouter1
-            opportunity['sell_router'],      # dexRouter2
-            opportunity['buy_path'],         # buyPath
-            opportunity['sell_path'],        # sellPath
-            opportunity.get('min_out_buy', opportunity['trade_size']),  # minOutBuy
-            opportunity.get('min_out_sell', opportunity['trade_size']), # minOutSell
-            self.bot.config['trading']['min_profit'],  # minProfit
-            opportunity['base_asset'],       # profitToken
-            opportunity['nonce'],            # nonce
-            opportunity.get('deadline', int(time.time() + 300)),  # deadline
-            opportunity.get('max_gas_price', self.w3_main.eth.gas_price * 2)  # maxGasPrice
+            opportunity.strategy,            # strategy
+            opportunity.base_asset,          # loanAsset
+            opportunity.trade_size,          # loanAmount
+            opportunity.buy_router,          # dexRouter1
+            opportunity.sell_router,         # dexRouter2
+            opportunity.buy_path,            # buyPath
+            opportunity.sell_path,           # sellPath
+            opportunity.min_out_buy or opportunity.trade_size,   # minOutBuy
+            opportunity.min_out_sell or opportunity.trade_size,  # minOutSell
+            self.bot.trading_cfg.min_profit,  # minProfit
+            opportunity.base_asset,          # profitToken
+            opportunity.nonce,               # nonce
+            opportunity.deadline or int(time.time() + 300),      # deadline
+            opportunity.max_gas_price or gas_price * 2           # maxGasPrice
         )
-        
-        # بناء المعاملة
-        tx = self.bot.contract.functions.executeFlashLoan(
-            params,
-            opportunity['signature']
-        ).build_transaction({
+
+        # ترميز النداء يدوياً - selector والأنواع ثابتة، فيتخطى مسار
+        # contract.functions بالكامل (تحليل ABI وتقدير الغاز في build_transaction)
+        signature = opportunity.signature
+        sig_bytes = bytes.fromhex(signature[2:] if signature.startswith('0x') else signature)
+        data = EXECUTE_FLASHLOAN_SELECTOR + abi_encode(
+            EXECUTE_FLASHLOAN_TYPES, [params, sig_bytes]
+        )
+
+        return {
             'from': self.bot.executor.address,
-            'nonce': self.w3_main.eth.get_transaction_count(self.bot.executor.address),
+            'to': self.bot.contract.address,
+            'data': data,
+            'value': 0,
+            'nonce': await self._next_nonce(),
             'gas': 1000000,  # تقدير آمن
-            'maxFeePerGas': opportunity.get('max_gas_price', self.w3_main.eth.gas_price * 2),
-            'maxPriorityFeePerGas': self.w3_main.eth.gas_price,
+            'maxFeePerGas': opportunity.max_gas_price or gas_price * 2,
+            'maxPriorityFeePerGas': gas_price,
             'chainId': 137  # Polygon
-        })
-        
-        return tx
-    
+        }
+
+    async def _next_nonce(self) -> int:
+        """nonce التالي من العداد المحلي - بلا رحلة RPC في المسار الحرج"""
+        async with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = await self.w3_main.eth.get_transaction_count(
+                    self.bot.executor.address, 'pending'
+                )
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    async def _resync_nonce(self):
+        """إعادة مزامنة العداد من العقدة بعد فشل إرسال"""
+        try:
+            async with self._nonce_lock:
+                self._nonce = await self.w3_main.eth.get_transaction_count(
+                    self.bot.executor.address, 'pending'
+                )
+        except Exception as e:
+            logger.error(f"Nonce resync failed: {e}")
+            self._nonce = None
+
     async def _send_private_transaction(self, raw_tx: bytes) -> Optional[str]:
         """إرسال معاملة خاصة"""
         try:
@@ -145,7 +232,7 @@ class TransactionExecutor:
     async def _send_regular_transaction(self, raw_tx: bytes) -> Optional[str]:
         """إرسال معاملة عادية"""
         try:
-            tx_hash = self.w3_main.eth.send_raw_transaction(raw_tx)
+            tx_hash = await self.w3_main.eth.send_raw_transaction(raw_tx)
             logger.info(f"📤 Regular transaction sent: {tx_hash.hex()}")
             return tx_hash.hex()
         except Exception as e:
@@ -153,34 +240,98 @@ class TransactionExecutor:
             return None
     
     async def _wait_for_execution(self, tx_hash: str, timeout: int = 120) -> bool:
-        """انتظار تأكيد المعاملة"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
+        """انتظار تأكيد المعاملة عبر مهمة الاستطلاع المشتركة"""
+        event = self._receipt_events.setdefault(tx_hash, asyncio.Event())
+
+        # مهمة واحدة تستطلع كل المعاملات النشطة بدل حلقة لكل معاملة
+        if self._receipt_task is None or self._receipt_task.done():
+            if self._ws_url:
+                self._receipt_task = asyncio.create_task(self._head_subscription_loop())
+            else:
+                self._receipt_task = asyncio.create_task(self._receipt_poll_loop())
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏰ Transaction timeout: {tx_hash}")
+            return False
+        finally:
+            self._receipt_events.pop(tx_hash, None)
+
+        receipt = self._receipts.get(tx_hash)
+        if receipt is not None and receipt.status == 1:
+            logger.info(f"✅ Transaction confirmed: {tx_hash}")
+            return True
+
+        logger.error(f"❌ Transaction failed: {tx_hash}")
+        return False
+
+    async def _drain_receipts(self):
+        """جلب إيصالات كل المعاملات المنتظرة في طلب JSON-RPC مجمع واحد"""
+        pending = [h for h in self._receipt_events if h not in self._receipts]
+        if not pending:
+            return
+
+        # دفعة واحدة لكل دورة - رحلة HTTP واحدة مهما كان عدد المعاملات
+        try:
+            async with self.w3_main.batch_requests() as batch:
+                for tx_hash in pending:
+                    batch.add(self.w3_main.eth.get_transaction_receipt(tx_hash))
+                results = await batch.async_execute()
+        except Exception as e:
+            # إيصال غير موجود بعد أو خطأ شبكة - الدورة التالية تعيد المحاولة
+            logger.debug("Batched receipt fetch failed: %s", e)
+            return
+
+        for tx_hash, receipt in zip(pending, results):
+            if isinstance(receipt, Exception) or receipt is None:
+                continue
+            self._receipts[tx_hash] = receipt
+            event = self._receipt_events.get(tx_hash)
+            if event:
+                event.set()
+
+    async def _receipt_poll_loop(self):
+        """المسار الاحتياطي بلا WebSocket: استطلاع كل 0.5 ثانية"""
+        while self._receipt_events:
+            await self._drain_receipts()
+            await asyncio.sleep(0.5)
+
+    async def _head_subscription_loop(self):
+        """الإيصالات لا تتغير إلا مع بلوك جديد - رأس البلوك هو المحفز الوحيد"""
+        while self._receipt_events:
             try:
-                receipt = self.w3_main.eth.get_transaction_receipt(tx_hash)
-                
-                if receipt is not None:
-                    if receipt.status == 1:
-                        logger.info(f"✅ Transaction confirmed: {tx_hash}")
-                        return True
-                    else:
-                        logger.error(f"❌ Transaction failed: {tx_hash}")
-                        return False
+                async with AsyncWeb3.persistent_websocket(
+                    WebsocketProviderV2(self._ws_url)
+                ) as w3_ws:
+                    await w3_ws.eth.subscribe('newHeads')
+
+                    async for _ in w3_ws.ws.process_subscriptions():
+                        await self._drain_receipts()
+                        if not self._receipt_events:
+                            break
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.debug(f"Waiting for receipt: {e}")
-            
-            await asyncio.sleep(0.5)
-        
-        logger.warning(f"⏰ Transaction timeout: {tx_hash}")
-        return False
+                logger.warning(f"Head subscription dropped, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    async def _get_receipt(self, tx_hash: str):
+        """قراءة الإيصال من الكاش أو جلبه مرة واحدة"""
+        receipt = self._receipts.get(tx_hash)
+        if receipt is None:
+            receipt = await self.w3_main.eth.get_transaction_receipt(tx_hash)
+            if receipt is not None:
+                self._receipts[tx_hash] = receipt
+        return receipt
     
     async def _calculate_actual_profit(self, tx_hash: str) -> int:
         """حساب الربح الفعلي من المعاملة"""
         try:
-            # الحصول على أحداث المعاملة
-            receipt = self.w3_main.eth.get_transaction_receipt(tx_hash)
-            
+            # الحصول على أحداث المعاملة (من الكاش - جُلب الإيصال مسبقاً)
+            receipt = await self._get_receipt(tx_hash)
+
             if receipt and receipt.logs:
                 # تحليل الأحداث للعثور على ربح الصفقة
                 # هذا يعتمد على events العقد
@@ -193,10 +344,10 @@ class TransactionExecutor:
             logger.error(f"Error calculating actual profit: {e}")
             return 0
     
-    def _update_gas_stats(self, tx_hash: str):
+    async def _update_gas_stats(self, tx_hash: str):
         """تحديث إحصائيات الغاز"""
         try:
-            receipt = self.w3_main.eth.get_transaction_receipt(tx_hash)
+            receipt = await self._get_receipt(tx_hash)
             if receipt:
                 gas_used = receipt.gasUsed
                 gas_price = receipt.effectiveGasPrice
@@ -211,8 +362,8 @@ class TransactionExecutor:
     async def estimate_gas_cost(self) -> int:
         """تقدير تكلفة الغاز"""
         try:
-            gas_price = self.w3_main.eth.gas_price
-            
+            gas_price = await self.bot.cached_gas_price()
+
             # تقدير الغاز المطلوب لمعاملة Flash Loan
             estimated_gas = 500000  # تقدير معقول
             